@@ -1,6 +1,6 @@
 """Write data to an XLSX file and download it."""
 # standard modules
-from io import BytesIO
+from tempfile import SpooledTemporaryFile
 from datetime import date
 import types
 
@@ -12,6 +12,9 @@ import pandas as pd
 # local modules
 from .formats import WorkbookFormats
 
+# largest XLSX output, in bytes, to keep in memory before using disk
+MAX_IN_MEMORY_BYTES = 8 * 1024 * 1024
+
 
 class ExcelExport:
     """Parent class for project-specific Excel export."""
@@ -20,10 +23,10 @@ class ExcelExport:
         return None
 
     def build(self, **kwargs):
-        # Create bytes output to return to client
-        io = BytesIO()
-        writer = pd.ExcelWriter("temp.xlsx", engine="xlsxwriter")
-        writer.book.filename = io
+        # Create file output to return to client, kept in memory unless the
+        # workbook is large, in which case it is written to a temporary file
+        io = SpooledTemporaryFile(max_size=MAX_IN_MEMORY_BYTES)
+        writer = pd.ExcelWriter(io, engine="xlsxwriter")
 
         # add a worksheet
         workbook = writer.book
@@ -10,7 +10,6 @@ from pony.orm import db_session, select, get, count
 from openpyxl import load_workbook
 from werkzeug import ImmutableMultiDict
 import pandas as pd
-import pprint
 
 # local modules
 from .formats import WorkbookFormats
@@ -18,9 +17,6 @@ from .export import ExcelExport, SheetSettings
 from api import schema
 from ..routing import routes
 
-# constants
-pp = pprint.PrettyPrinter(indent=4)
-
 
 class SchmidtExportPlugin(ExcelExport):
     """Schmidt-specific ExcelExport-style class that writes data
@@ -337,9 +333,9 @@ class SchmidtExportPlugin(ExcelExport):
             # create dict to store row information
             row = {
                 "Term definitions": {
-                    "Column name": d.colname,
-                    "Term": d.term,
-                    "Definition": d.definition,
+                    "Column name": d["colname"],
+                    "Term": d["term"],
+                    "Definition": d["definition"],
                 }
             }
 
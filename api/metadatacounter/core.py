@@ -1,6 +1,6 @@
 # standard packages
 from api import schema
-from typing import List
+from typing import Callable, Dict, List, Tuple
 
 # 3rd party packages
 from pony.orm.core import Query, db_session, desc, coalesce, count, select
@@ -8,6 +8,155 @@ from pony.orm.core import Query, db_session, desc, coalesce, count, select
 
 # local modules
 from api.db_models.models import Item
+from api.utils import freeze, LRUCache
+
+# maximum number of filter categories' counts kept in the cache
+COUNTS_CACHE_MAXSIZE: int = 4096
+
+# counts for each filter category, keyed by the category and everything that
+# affects its counts, i.e., the filters other than its own, the search text,
+# and the values excluded; least recently used counts are evicted first
+_counts_by_category: LRUCache = LRUCache(maxsize=COUNTS_CACHE_MAXSIZE)
+
+
+# unique-item and by-value count queries for linked fields, by field and
+# linked attribute; each takes the items, the values to exclude, and whether
+# to allow None values. Attribute names are written as literals so that each
+# query keeps its cached SQL translation, which Pony discards whenever an
+# attribute name given to `getattr` changes
+LINKED_COUNT_QUERIES: Dict[Tuple[str, str], Tuple[Callable, Callable]] = {
+    ("events", "name"): (
+        lambda items, exclude, allow_none: select(
+            i.id
+            for i in items
+            for j in i.events
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+        lambda items, exclude, allow_none: select(
+            (j.name, count(i))
+            for i in items
+            for j in i.events
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+    ),
+    ("key_topics", "name"): (
+        lambda items, exclude, allow_none: select(
+            i.id
+            for i in items
+            for j in i.key_topics
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+        lambda items, exclude, allow_none: select(
+            (j.name, count(i))
+            for i in items
+            for j in i.key_topics
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+    ),
+    ("covid_tags", "name"): (
+        lambda items, exclude, allow_none: select(
+            i.id
+            for i in items
+            for j in i.covid_tags
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+        lambda items, exclude, allow_none: select(
+            (j.name, count(i))
+            for i in items
+            for j in i.covid_tags
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+    ),
+    ("authors", "authoring_organization"): (
+        lambda items, exclude, allow_none: select(
+            i.id
+            for i in items
+            for j in i.authors
+            if j.authoring_organization not in exclude
+            and (j.authoring_organization is not None or allow_none)
+        ),
+        lambda items, exclude, allow_none: select(
+            (j.authoring_organization, count(i))
+            for i in items
+            for j in i.authors
+            if j.authoring_organization not in exclude
+            and (j.authoring_organization is not None or allow_none)
+        ),
+    ),
+    ("authors", "type_of_authoring_organization"): (
+        lambda items, exclude, allow_none: select(
+            i.id
+            for i in items
+            for j in i.authors
+            if j.type_of_authoring_organization not in exclude
+            and (j.type_of_authoring_organization is not None or allow_none)
+        ),
+        lambda items, exclude, allow_none: select(
+            (j.type_of_authoring_organization, count(i))
+            for i in items
+            for j in i.authors
+            if j.type_of_authoring_organization not in exclude
+            and (j.type_of_authoring_organization is not None or allow_none)
+        ),
+    ),
+    ("funders", "name"): (
+        lambda items, exclude, allow_none: select(
+            i.id
+            for i in items
+            for j in i.funders
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+        lambda items, exclude, allow_none: select(
+            (j.name, count(i))
+            for i in items
+            for j in i.funders
+            if j.name not in exclude and (j.name is not None or allow_none)
+        ),
+    ),
+}
+
+
+def get_linked_query_funcs(
+    field: str, link_field: str
+) -> Tuple[Callable, Callable]:
+    """Return functions that build the unique-item and by-value count queries
+    for a linked field.
+
+    Args:
+        field (str): The item attribute linking to other entities, e.g.,
+        `authors`.
+
+        link_field (str): The attribute of the linked entity to count by, e.g.,
+        `authoring_organization`.
+
+    Returns:
+        Tuple[Callable, Callable]: Functions taking the items, values to
+        exclude, and whether to allow None values, that return the unique-item
+        and by-value count queries, respectively.
+    """
+    if (field, link_field) in LINKED_COUNT_QUERIES:
+        return LINKED_COUNT_QUERIES[(field, link_field)]
+
+    # otherwise, query the linked attribute by name
+    def get_unique_query(items, exclude, allow_none) -> Query:
+        return select(
+            i.id
+            for i in items
+            for j in getattr(i, field)
+            if getattr(j, link_field) not in exclude
+            and (getattr(j, link_field) is not None or allow_none)
+        )
+
+    def get_by_value_query(items, exclude, allow_none) -> Query:
+        return select(
+            (getattr(j, link_field), count(i))
+            for i in items
+            for j in getattr(i, field)
+            if getattr(j, link_field) not in exclude
+            and (getattr(j, link_field) is not None or allow_none)
+        )
+
+    return get_unique_query, get_by_value_query
 
 
 class MetadataCounter:
@@ -40,6 +189,9 @@ class MetadataCounter:
         if all_items is None:
             all_items = Item
 
+        # deduplicate values to exclude so each is only bound once in SQL
+        exclude = frozenset(exclude or ())
+
         # exclude None-values if those are in the `exclude` list as 'null'
         allow_none = "null" not in exclude
 
@@ -96,10 +248,16 @@ class MetadataCounter:
             else:
                 return lambda x, y: desc(y)
 
+        # build the sort funcs once for reuse by every category below
+        order_by_funcs: dict = {
+            include_id_and_acronym: get_order_by_func(include_id_and_acronym)
+            for include_id_and_acronym in (True, False)
+        }
+
         # return the appropriate "by value" query given whether to include the
         # ID field or not
         def get_query_body(include_id_and_acronym, link_field, field_items):
-            order_by_func = get_order_by_func(include_id_and_acronym)
+            order_by_func = order_by_funcs[include_id_and_acronym]
             if include_id_and_acronym:
                 return select(
                     (
@@ -114,17 +272,20 @@ class MetadataCounter:
                     and (getattr(j, link_field) is not None or allow_none)
                 ).order_by(order_by_func)[:][:]
             else:
-                return select(
-                    (getattr(j, link_field), count(i))
-                    for i in field_items
-                    for j in getattr(i, field)
-                    if getattr(j, link_field) not in exclude
-                    and (getattr(j, link_field) is not None or allow_none)
+                _, get_by_value_query = get_linked_query_funcs(
+                    field, link_field
+                )
+                return get_by_value_query(
+                    field_items, exclude, allow_none
                 ).order_by(order_by_func)[:][:]
 
         # init output dict
         output = dict()
 
+        # filtered item queries by the filter field they skip; facets whose
+        # filter field is not among the active filters all share one query
+        field_items_by_skipped: dict = dict()
+
         # iterate on each filter category and define the number of unique items
         # in it overall and by value, except those in `exclude`
         for d in to_check:
@@ -135,13 +296,37 @@ class MetadataCounter:
             is_linked = "link_field" in d
             is_date_part = d.get("is_date_part", False)
 
-            # get `items` to use for this category
-            field_items = self.__get_items_without_filter(
-                items=all_items,
-                filters=filters,
-                filter_to_skip=filter_field,
-                search_text=search_text,
+            # reuse counts for this category if the filters affecting it are
+            # unchanged, e.g., if only its own filter changed; counts over
+            # a custom set of items are not cached
+            cache_key: tuple = freeze(
+                (
+                    key,
+                    {k: v for k, v in filters.items() if k != filter_field},
+                    search_text,
+                    exclude,
+                )
             )
+            use_cache: bool = all_items is Item
+            if use_cache:
+                try:
+                    output[key] = _counts_by_category[cache_key]
+                    continue
+                except KeyError:
+                    pass
+
+            # get `items` to use for this category
+            skipped: str = filter_field if filter_field in filters else None
+            if skipped not in field_items_by_skipped:
+                field_items_by_skipped[
+                    skipped
+                ] = self.__get_items_without_filter(
+                    items=all_items,
+                    filters=filters,
+                    filter_to_skip=skipped,
+                    search_text=search_text,
+                )
+            field_items = field_items_by_skipped[skipped]
 
             # init output dict section
             output[key] = dict()
@@ -156,29 +341,26 @@ class MetadataCounter:
 
                 link_field = d["link_field"]  # the date part, e.g., `year`
 
-                # get unique count of items that meet exclusion criteria
-                unique_count = select(
-                    i
-                    for i in field_items
-                    if str(getattr(getattr(i, field), link_field))
-                    not in exclude
-                    and (
-                        str(getattr(getattr(i, field), link_field)) is not None
-                        or allow_none
-                    )
-                ).count()
-                output[key]["unique"] = unique_count
+                # compare date parts as integers so no text cast is needed
+                # per row, and keep items without a date unless nulls are
+                # excluded
+                exclude_parts: List[int] = [
+                    int(v) for v in exclude if str(v).isdigit()
+                ]
 
                 by_value_counts = select(
                     (getattr(getattr(i, field), link_field), count(i))
                     for i in field_items
-                    if str(getattr(getattr(i, field), link_field))
-                    not in exclude
-                    and (
-                        str(getattr(getattr(i, field), link_field)) is not None
-                        or allow_none
+                    if (getattr(i, field) is None and allow_none)
+                    or (
+                        getattr(i, field) is not None
+                        and getattr(getattr(i, field), link_field)
+                        not in exclude_parts
                     )
-                ).order_by(get_order_by_func(False))[:][:]
+                ).order_by(order_by_funcs[False])[:][:]
+
+                # each item has one date, so the unique count is the total
+                output[key]["unique"] = sum(c for _, c in by_value_counts)
                 output[key]["by_value"] = by_value_counts
 
             # count linked fields specially
@@ -186,13 +368,12 @@ class MetadataCounter:
                 link_field = d["link_field"]
                 include_id_and_acronym = d.get("include_id_and_acronym", False)
 
-                # get unique count of items that meet exclusion criteria
-                unique_count = select(
-                    i.id
-                    for i in field_items
-                    for j in getattr(i, field)
-                    if getattr(j, link_field) not in exclude
-                    and (getattr(j, link_field) is not None or allow_none)
+                # get unique count of items that meet exclusion criteria;
+                # items may have several values, so this is not the sum of
+                # the counts by value
+                get_unique_query, _ = get_linked_query_funcs(field, link_field)
+                unique_count = get_unique_query(
+                    field_items, exclude, allow_none
                 ).count()
                 output[key]["unique"] = unique_count
 
@@ -203,23 +384,20 @@ class MetadataCounter:
 
             # count standard fields
             else:
-                # get unique count of items that meet exclusion criteria
-                unique_count = select(
-                    i.id
-                    for i in field_items
-                    if getattr(i, field) not in exclude
-                    and (getattr(i, field) is not None or allow_none)
-                ).count()
-                output[key]["unique"] = unique_count
-
                 by_value_counts = select(
                     (getattr(i, field), count(i))
                     for i in field_items
                     if getattr(i, field) not in exclude
                     and (getattr(i, field) is not None or allow_none)
-                ).order_by(get_order_by_func(False))[:][:]
+                ).order_by(order_by_funcs[False])[:][:]
+
+                # each item has one value, so the unique count is the total
+                output[key]["unique"] = sum(c for _, c in by_value_counts)
                 output[key]["by_value"] = by_value_counts
 
+            if use_cache:
+                _counts_by_category[cache_key] = output[key]
+
         return output
 
     @db_session
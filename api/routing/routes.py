@@ -13,7 +13,6 @@ from api.namespaces import item, metadata, search, downloads, deprecated
 from api.main import app, api
 from api.routing.models import ItemBody, SearchResponse
 from api.utils import format_response
-from api.metadatacounter.core import MetadataCounter
 
 
 def add_search_text_arg(parser):
@@ -262,13 +261,13 @@ class File(Resource):
             )
         except Exception:
             return Response("No File found with that ID", status=404)
-        data = details["data"]
-        data.seek(0)
-        return send_file(
-            data,
+        response = send_file(
+            details["data"],
             attachment_filename=details["attachment_filename"],
             as_attachment=details["as_attachment"],
         )
+        response.content_length = details["content_length"]
+        return response
 
 
 @search.route("/search", methods=["POST"])
@@ -292,6 +291,14 @@ class Search(Resource):
     # add ordering (sorting) arguments to parser
     add_ordering_args(parser)
 
+    parser.add_argument(
+        "fields",
+        type=str,
+        required=False,
+        help="Comma-separated names of the Item fields to return; if omitted,"
+        " all fields and related entities are returned",
+    )
+
     @api.doc(
         parser=parser,
         body=ItemBody,
@@ -315,6 +322,11 @@ class Search(Resource):
         if search_text == "":
             search_text = None
 
+        # get fields to return, or None if all
+        fields = request.args.get("fields", None)
+        if fields is not None:
+            fields = [f.strip() for f in fields.split(",") if f.strip() != ""]
+
         return schema.get_search(
             page=int(request.args.get("page", 1)),
             pagesize=int(request.args.get("pagesize", 10000000)),
@@ -324,6 +336,7 @@ class Search(Resource):
             is_desc=request.args.get("is_desc", "false") == "true",
             preview=request.args.get("preview", "false") == "true",
             explain_results=request.args.get("explain_results", "false") == "true",
+            fields=fields,
         )
 
 
@@ -346,9 +359,8 @@ class Filter_Counts(Resource):
 
         # get ids of items from URL params
         exclude = request.args.getlist("exclude")
-        counter: MetadataCounter = MetadataCounter()
-        return counter.get_metadata_value_counts(
-            items=None, exclude=exclude, filters={}, search_text=search_text
+        return schema.get_filter_counts(
+            filters={}, search_text=search_text, exclude=exclude
         )
 
 
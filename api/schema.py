@@ -5,16 +5,15 @@
 # Standard libraries
 import functools
 import re
-import math
 import logging
-from io import BytesIO
-from typing import Any, Callable, Dict, List, Set, Tuple, Union
+from datetime import date
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
 
 # Third party libraries
 import boto3
-import pprint
-from pony.orm import select, db_session, raw_sql, count
-from pony.orm.core import Query
+from pony.orm import select, db_session, raw_sql, exists
+from pony.orm.core import Attribute, Query
+from pony.orm.ormtypes import RawSQL
 from flask import Response
 
 # Local libraries
@@ -22,18 +21,158 @@ from api.db_models.models import Item, Metadata, Glossary
 from db.db import db
 from . import search
 from .export import SchmidtExportPlugin
-from .utils import is_listlike, jsonify_response, DefaultOrderedDict
+from .utils import freeze, is_listlike, jsonify_custom, jsonify_response, LRUCache
 from api.metadatacounter.core import MetadataCounter
 
-# pretty printing: for printing JSON objects legibly
-pp = pprint.PrettyPrinter(indent=4)
 s3 = boto3.client("s3")
 
+# maximum number of outputs kept by each cached function; cached outputs are
+# never invalidated, since data only change when they are ingested, after
+# which the API server is restarted
+CACHE_MAXSIZE: int = 128
+
+# linked entities prefetched for items that are returned with their related
+# entities; related items (`Item.items`) are not prefetched, since prefetching
+# applies to every item loaded and would cascade through related items
+ITEM_PREFETCH: tuple = (
+    Item.covid_tags,
+    Item.key_topics,
+    Item.funders,
+    Item.authors,
+    Item.tags,
+    Item.files,
+    Item.related_files,
+    Item.events,
+    Item.covid_topics,
+)
+
+
+def _filter_items_by_id(items: Query, allowed_values: List[str]) -> Query:
+    """Returns the items whose IDs are among the allowed values, compared as
+    integers so the primary key index can be used.
+
+    Args:
+        items (Query): The query selecting items.
+
+        allowed_values (List[str]): The allowed IDs, as strings.
+
+    Returns:
+        Query: The filtered items query.
+    """
+    ids: Tuple[int, ...] = tuple(int(v) for v in allowed_values if v.isdigit())
+    return items.filter(lambda i: i.id in ids)
+
+
+# queries filtering items to those with an attribute, tag, or linked entity
+# attribute value in the allowed values, by filter field; each filter has its
+# own query so Pony can reuse its translation, which it cannot if the names of
+# the attributes are variables
+RELATION_FILTERS: Dict[str, Callable[[Query, List[str]], Query]] = {
+    "id": _filter_items_by_id,
+    "type_of_record": lambda items, allowed_values: items.filter(
+        lambda i: str(i.type_of_record) in allowed_values
+    ),
+    "key_topics": lambda items, allowed_values: items.filter(
+        lambda i: exists(j for j in i.key_topics if j.name in allowed_values)
+    ),
+    "covid_tags": lambda items, allowed_values: items.filter(
+        lambda i: exists(j for j in i.covid_tags if j.name in allowed_values)
+    ),
+    "author.id": lambda items, allowed_values: items.filter(
+        lambda i: exists(j for j in i.authors if str(j.id) in allowed_values)
+    ),
+    "author.type_of_authoring_organization": lambda items, allowed_values: items.filter(
+        lambda i: exists(
+            j
+            for j in i.authors
+            if str(j.type_of_authoring_organization) in allowed_values
+        )
+    ),
+    "funder.name": lambda items, allowed_values: items.filter(
+        lambda i: exists(j for j in i.funders if str(j.name) in allowed_values)
+    ),
+    "event.name": lambda items, allowed_values: items.filter(
+        lambda i: exists(j for j in i.events if str(j.name) in allowed_values)
+    ),
+}
+
+# orderings of items by field and whether descending, with nulls always last
+ITEM_ORDERINGS: Dict[Tuple[str, bool], RawSQL] = {
+    ("date", True): raw_sql("i.date DESC NULLS LAST"),
+    ("date", False): raw_sql("i.date NULLS LAST"),
+    ("title", True): raw_sql("i.title DESC NULLS LAST"),
+    ("title", False): raw_sql("i.title NULLS LAST"),
+}
+
+# item fields checked for search text matches to explain search results
+# basic string fields, checked for exact-insensitive matches
+SNIPPET_STR_FIELDS: Tuple[str, ...] = (
+    "type_of_record",
+    "title",
+    "description",
+    "link",
+    "sub_organizations",
+)
+
+# tag fields and the field of the tag that is checked
+SNIPPET_TAG_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("covid_tags", "name"),
+    ("key_topics", "name"),
+    ("events", "name"),
+)
+
+# linked fields, as `entity.field`
+SNIPPET_LINKED_FIELDS: Tuple[str, ...] = (
+    "authors.authoring_organization",
+    "authors.acronym",
+    "funders.name",
+)
+
+
+def _ceildiv(a: int, b: int) -> int:
+    """Return the ceiling of `a` divided by `b` using integer arithmetic."""
+    return -(-a // b)
+
+
+def _get_page_and_total(
+    query: Query,
+    page: int,
+    pagesize: int,
+    get_total: Callable[[], int] = None,
+) -> Tuple[list, int]:
+    """Returns one page of a query's results and the total number of results,
+    counting them only if the page does not show where the results end.
+
+    Args:
+        query (Query): The query to paginate.
+
+        page (int): The page number, starting at 1.
+
+        pagesize (int): The number of results per page.
+
+        get_total (Callable[[], int], optional): Function returning the total
+        number of results, e.g., from a cache. Defaults to None, in which case
+        the query is counted.
+
+    Returns:
+        Tuple[list, int]: The results on the page and the total number of
+        results.
+    """
+    # slice the query result to a plain list, which can be JSON-serialized
+    results: list = query.page(page, pagesize=pagesize)[:][:]
+    if 0 < len(results) < pagesize or (page == 1 and len(results) == 0):
+        return results, pagesize * (page - 1) + len(results)
+    elif get_total is not None:
+        return results, get_total()
+    else:
+        return results, query.count()
+
 
 def cached(func: Callable):
     """Decorator that returns function output if previously generated, as
-    indexed by the concatenated kwargs; otherwise, runs the function and stores
-    the output in the cache indexed by the concatenated kwargs.
+    indexed by the function arguments; otherwise, runs the function and stores
+    the output in the cache indexed by the function arguments. The least
+    recently used outputs are evicted once `CACHE_MAXSIZE` are stored.
 
     Args:
         func (Callable): Any function
@@ -41,14 +180,16 @@ def cached(func: Callable):
     Returns:
         Any: The function result, possibly from the cache.
     """
-    cache = {}
+    cache: LRUCache = LRUCache(maxsize=CACHE_MAXSIZE)
 
     @functools.wraps(func)
     def wrapper(*func_args, **kwargs):
 
-        key = str(kwargs)
-        if key in cache:
+        key: tuple = freeze((func_args, kwargs))
+        try:
             return cache[key]
+        except KeyError:
+            pass
 
         results = func(*func_args, **kwargs)
         cache[key] = results
@@ -57,17 +198,20 @@ def cached(func: Callable):
     return wrapper
 
 
-@db_session
 def cached_items(func: Callable) -> Any:
     """Return cached Item instances or cache them.
 
+    Only the IDs of the items are cached, so that Item instances are not held
+    beyond the database session that loaded them; they are selected again by
+    ID when the cached result is used.
+
     Args:
         func (Callable): Function, presumably one returning Item instances.
 
     Returns:
         Any: Function output, presumably Item instances.
     """
-    cache: dict = {}
+    cache: LRUCache = LRUCache(maxsize=CACHE_MAXSIZE)
 
     @functools.wraps(func)
     def wrapper(*func_args, **kwargs) -> Any:
@@ -76,19 +220,23 @@ def cached_items(func: Callable) -> Any:
         Returns:
             Any: Cache results or function output.
         """
-        key: str = str(kwargs)
-        if key in cache:
-
-            # get items by id
+        key: tuple = freeze((func_args, kwargs))
+        try:
             res_tuple_tmp: Any = cache[key]
-            item_ids: Set[int] = {i.id for i in res_tuple_tmp[0]}
-            refreshed_items: List[Item] = select(i for i in Item if i.id in item_ids)[
-                :
-            ][:]
+        except KeyError:
+            res_tuple_tmp = None
+        if res_tuple_tmp is not None:
+
+            # get items by id, in their cached order
+            item_ids: Tuple[int, ...] = res_tuple_tmp[0]
+            items_by_id: Dict[int, Item] = {
+                i.id: i for i in select(i for i in Item if i.id in item_ids)
+            }
+            refreshed_items: List[Item] = [items_by_id[id] for id in item_ids]
             return (refreshed_items, res_tuple_tmp[1], res_tuple_tmp[2])
 
         results: Any = func(*func_args, **kwargs)
-        cache[key] = results
+        cache[key] = (tuple(i.id for i in results[0]), results[1], results[2])
         return results
 
     return wrapper
@@ -102,16 +250,29 @@ def get_items(
     is_desc: bool = True,
     order_by: str = "date",
 ):
-    # get all items
-    selected_items = select(i for i in db.Item if (len(ids) == 0 or i.id in ids))
+    # get all items, prefetching the linked entities that are serialized
+    selected_items = select(
+        i for i in db.Item if (len(ids) == 0 or i.id in ids)
+    ).prefetch(
+        db.Item.key_topics,
+        db.Item.funders,
+        db.Item.authors,
+        db.Item.files,
+        db.Item.events,
+    )
 
     # order items
     ordered_items = apply_ordering_to_items(selected_items, order_by, is_desc)
 
-    # get total num items, pages, etc. for response
-    total = count(ordered_items)
-    items = ordered_items.page(page, pagesize=pagesize)[:][:]
-    num_pages = math.ceil(total / pagesize)
+    # get total num items, pages, etc. for response; the total is cached so
+    # that paging through the items counts them once
+    items, total = _get_page_and_total(
+        ordered_items,
+        page,
+        pagesize,
+        get_total=lambda: get_items_total(ids=ids),
+    )
+    num_pages = _ceildiv(total, pagesize)
 
     return {
         "page": page,
@@ -124,8 +285,32 @@ def get_items(
 
 
 @db_session
+@cached
+def get_items_total(ids: list = []) -> int:
+    """Returns the number of items with the given IDs, or of all items if no
+    IDs are given.
+
+    Args:
+        ids (list, optional): Item IDs. Defaults to [].
+
+    Returns:
+        int: The number of items.
+    """
+    if len(ids) == 0:
+        return select(i for i in db.Item).count()
+    else:
+        return select(i for i in db.Item if i.id in ids).count()
+
+
+@db_session
+@cached
 def get_metadata() -> List[dict]:
-    res: List[Metadata] = select(i for i in Metadata)[:][:]
+    """Get all metadata entries as dictionaries of their attributes.
+
+    Returns:
+        List[dict]: List of metadata entries.
+    """
+    res: List[Metadata] = select(i for i in Metadata)[:]
     return [d.to_dict() for d in res]
 
 
@@ -167,63 +352,58 @@ def get_item(
     all_related = []
     related = []
     total = None
-    related_by_topic = None
-    related_directly = None
+    direct_ids: Tuple[int, ...] = tuple()
     if include_related:
 
-        # get all items directly related
-        related_directly = select(
-            i for i in db.Item for tag in db.KeyTopic if i in item.items and i != item
-        )
-
-        # up to 10 items related by topic
-        max_related_to_select = (
-            0 if related_directly.count() >= 10 else 10 - related_directly.count()
-        )
-        related_by_topic = select(
-            i
-            for i in db.Item
-            for tag in db.KeyTopic
-            if tag in item.key_topics
-            and tag in i.key_topics
-            and i != item
-            and i not in related_directly
-        ).limit(max_related_to_select)
+        # resolve directly related item IDs once for reuse below
+        direct_ids = tuple(x.id for x in item.items if x.id != item.id)
+
+        # up to 10 items related by topic, selected by ID in one query
+        max_related_to_select = max(0, 10 - len(direct_ids))
+        topic_ids: Tuple[int, ...] = tuple()
+        if max_related_to_select > 0:
+            topic_ids = tuple(
+                select(
+                    i.id
+                    for i in db.Item
+                    if i != item
+                    and i.id not in direct_ids
+                    and exists(t for t in i.key_topics if t in item.key_topics)
+                ).limit(max_related_to_select)
+            )
 
         # concatenate and sort directly related items to appear first
-        all_related = select(
-            i for i in db.Item if i in related_directly or i in related_by_topic
-        ).order_by(lambda x: x not in item.items)
+        all_related_ids: Tuple[int, ...] = direct_ids + topic_ids
+        all_related = (
+            select(i for i in db.Item if i.id in all_related_ids)
+            .order_by(lambda x: x.id not in direct_ids)
+            .prefetch(*ITEM_PREFETCH)
+        )
 
         # get grand total
-        total = len(all_related)
+        total = len(all_related_ids)
 
         # get current page
         related = all_related.page(page, pagesize=pagesize)
 
     # return all data
     related_dicts = []
-    already_added = set()
 
     # process each item, adding the reason why it is related
     for d in related:
-        if d.id in already_added:
-            continue
+        why = list()
+        if d.id in direct_ids:
+            why.append("directly related")
         else:
-            why = list()
-            if d in item.items:
-                why.append("directly related")
-            if d not in item.items:
-                why.append("similar topic")
-
-            already_added.add(d.id)
-            datum = d.to_dict(
-                exclude=["search_text"],
-                with_collections=True,
-                related_objects=True,
-            )
-            datum["why"] = why
-            related_dicts.append(datum)
+            why.append("similar topic")
+
+        datum = d.to_dict(
+            exclude=["search_text"],
+            with_collections=True,
+            related_objects=True,
+        )
+        datum["why"] = why
+        related_dicts.append(datum)
 
     # create response dict
     res = {
@@ -236,7 +416,7 @@ def get_item(
 
     # add pagination data to response, if relevant
     if include_related:
-        res["num_pages"] = math.ceil(total / pagesize)
+        res["num_pages"] = _ceildiv(total, pagesize)
         res["page"] = page
         res["pagesize"] = pagesize
         res["total"] = total
@@ -263,11 +443,11 @@ def get_file(id: int, get_thumb: bool):
     file = db.File[id]
     key = file.s3_filename if not get_thumb else file.s3_filename + "_thumb"
 
-    # retrieve file and write it to IO file object `data`
+    # get a stream of the file's contents, which is read as the response is
+    # sent rather than downloaded in full first
     # if the file is not found in S3, return a 404 error
-    data = BytesIO()
     try:
-        s3.download_fileobj("schmidt-storage", key, data)
+        obj: dict = s3.get_object(Bucket="schmidt-storage", Key=key)
     except Exception as e:
         logging.exception(e)
         return "Document not found (404)"
@@ -276,7 +456,8 @@ def get_file(id: int, get_thumb: bool):
         file.filename if not get_thumb else file.s3_filename + "_thumb.png"
     )
     return {
-        "data": data,
+        "data": obj["Body"],
+        "content_length": obj["ContentLength"],
         "attachment_filename": attachment_filename,
         "as_attachment": False,
     }
@@ -293,6 +474,7 @@ def get_search(
     is_desc: bool = True,
     preview: bool = False,
     explain_results: bool = True,
+    fields: List[str] = None,
 ) -> dict:
     """Get search results.
 
@@ -317,6 +499,11 @@ def get_search(
         explain_results (bool, optional): True if information about why each
         search result matched should be returned. Defaults to True.
 
+        fields (List[str], optional): The item fields to return, or None to
+        return all fields and related entities. Names that are not item fields
+        are ignored, and if none are item fields, all fields are returned.
+        Defaults to None.
+
     Returns:
         dict: The search results data.
     """
@@ -335,103 +522,89 @@ def get_search(
         explain_results=explain_results,
     )
 
-    # paginate items
-    # apply most efficient pagination method based on `items` type
+    # if preview: return counts of items and matching instances only, without
+    # fetching or serializing any page of items
     total: int = None
-    if type(ordered_items) == list:
-        start = 1 + pagesize * (page - 1) - 1
-        end = pagesize * (page)
-        total = len(ordered_items)
-        items = ordered_items[start:end]
-    else:
-        total = ordered_items.count()
-        items = ordered_items.page(page, pagesize=pagesize)
+    if preview:
+        total = get_search_total(filters=filters, search_text=search_text)
+        return {
+            "n_items": total,
+            "other_instances": other_instances,
+            "search_text": search_text,
+        }
+
+    # paginate items
+    items, total = _get_page_and_total(
+        ordered_items,
+        page,
+        pagesize,
+        get_total=lambda: get_search_total(filters=filters, search_text=search_text),
+    )
 
     # if applicable, get explanation for search results (snippets)
     data_snippets: list = list()
     if (
-        not preview
-        and explain_results
+        explain_results
         and search_text is not None
         and search_text != ""
+        and len(items) > 0
     ):
-        cur_search_text = search_text.lower() if search_text is not None else ""
-
-        # TODO reuse code in search.py
-        pattern = re.compile(cur_search_text, re.IGNORECASE)
+        cur_search_text = search_text.lower()
 
-        def repl(x):
-            return "<highlight>" + x.group(0) + "</highlight>"
+        # compile once for all items; escape so the search text is matched
+        # literally even if it contains regex metacharacters
+        pattern = re.compile(re.escape(search_text), re.IGNORECASE)
+        repl = search.highlight_match
 
         for d in items:
             snippets = dict()
             at_least_one = False
-            # check basic string fields for exact-insensitive matches
-            # TODO tag fields, linked fields
-            fields_str = (
-                "type_of_record",
-                "title",
-                "description",
-                "link",
-                "sub_organizations",
-            )
 
             # basic fields
-            for field in fields_str:
-                if cur_search_text in getattr(d, field).lower():
+            for field in SNIPPET_STR_FIELDS:
+                highlighted, n_matches = pattern.subn(repl, getattr(d, field) or "")
+                if n_matches > 0:
                     at_least_one = True
-                    snippets[field] = re.sub(pattern, repl, getattr(d, field))
+                    snippets[field] = highlighted
 
             # tag fields
-            # TODO
-            fields_tag_str = (
-                ("covid_tags", "name"),
-                ("key_topics", "name"),
-                ("events", "name"),
-            )
-            for field, linked_field in fields_tag_str:
+            for field, linked_field in SNIPPET_TAG_FIELDS:
                 value = getattr(getattr(d, field), linked_field)
                 if type(value) == str:
-                    if cur_search_text in value.lower():
+                    highlighted, n_matches = pattern.subn(repl, value)
+                    if n_matches > 0:
                         at_least_one = True
-                        snippets[field] = re.sub(pattern, repl, getattr(d, field))
+                        snippets[field] = highlighted
                 else:
                     matches = list()
                     for v in value:
-                        if cur_search_text in v.lower():
+                        highlighted, n_matches = pattern.subn(repl, v)
+                        if n_matches > 0:
                             at_least_one = True
-                            matches.append({"name": re.sub(pattern, repl, v), "id": v})
+                            matches.append({"name": highlighted, "id": v})
                     if len(matches) > 0:
                         snippets[field] = matches
 
             # linked fields
-            linked_fields_str = (
-                "authors.authoring_organization",
-                "authors.acronym",
-                "funders.name",
-            )
-            for field_tmp in linked_fields_str:
+            for field_tmp in SNIPPET_LINKED_FIELDS:
                 arr_tmp = field_tmp.split(".")
                 entity_name = arr_tmp[0]
                 field = arr_tmp[1]
+                # if the field is the author's acronym, count this as a match
+                # with the entire author's name
+                count_as_entire_author_name = field_tmp == "authors.acronym"
+                snippet_field = (
+                    field
+                    if not count_as_entire_author_name
+                    else "authoring_organization"
+                )
                 for linked_instance in getattr(d, entity_name):
-                    if cur_search_text in getattr(linked_instance, field).lower():
+                    highlighted, n_matches = pattern.subn(
+                        repl, getattr(linked_instance, field) or ""
+                    )
+                    if n_matches > 0:
                         at_least_one = True
 
-                        # if the field is the author's acronym, count this as
-                        # a match with the entire author's name
-                        count_as_entire_author_name = field_tmp == "authors.acronym"
-
-                        # get value of match
-                        value = (
-                            getattr(linked_instance, field)
-                            if not count_as_entire_author_name
-                            else linked_instance.authoring_organization
-                        )
-
-                        if count_as_entire_author_name:
-                            field = "authoring_organization"
-
                         if entity_name not in snippets:
                             snippets[entity_name] = []
 
@@ -441,15 +614,20 @@ def get_search(
                         # highlight relevant snippet, unless this is an acronym
                         # match, in which case highlight entire publisher name
                         if not count_as_entire_author_name:
-                            cur_snippet[field] = re.sub(pattern, repl, value)
+                            cur_snippet[snippet_field] = highlighted
                         else:
-                            cur_snippet[field] = f"""<highlight>{value}</highlight>"""
+                            value = linked_instance.authoring_organization
+                            cur_snippet[
+                                snippet_field
+                            ] = f"""<highlight>{value}</highlight>"""
 
                         cur_snippet["id"] = linked_instance.id
                         snippets[entity_name].append(cur_snippet)
 
             # custom tags?
-            if any(search_text in dd.lower() for dd in d.tags.name):
+            # one scan over all tag names, separated so that no match spans
+            # two tags
+            if pattern.search("\0".join(d.tags.name)) is not None:
                 at_least_one = True
                 snippets["tags"] = "Search tags contain text match"
 
@@ -461,41 +639,59 @@ def get_search(
             # append results
             data_snippets.append(snippets if at_least_one else dict())
 
-    # if preview: return counts of items and matching instances
-    data = None
-    if preview:
-
-        data = {
-            "n_items": total,
-            "other_instances": other_instances,
-            "search_text": search_text,
-        }
-    else:
-        # otherwise: return paginated items and details
-        num_pages = math.ceil(total / pagesize)
-        item_dicts = [
-            d.to_dict(
-                exclude=["search_text"],
-                with_collections=True,
-                related_objects=True,
-            )
-            for d in items
-        ]
-        data = {
-            "page": page,
-            "num_pages": num_pages,
-            "pagesize": pagesize,
-            "total": total,
-            "num": len(item_dicts),
-            "data": item_dicts,
-        }
-        if explain_results:
-            data["data_snippets"] = data_snippets
-            data["filter_counts"] = filter_counts
+    # return paginated items and details
+    num_pages = _ceildiv(total, pagesize)
+    # if specified, return only the requested fields of each item
+    only: List[str] = None
+    if fields is not None:
+        only = [f for f in fields if isinstance(getattr(Item, f, None), Attribute)]
+
+        # if no item fields were requested, return all of them
+        if len(only) == 0:
+            only = None
+    item_dicts = [
+        d.to_dict(
+            only=only,
+            exclude=["search_text"],
+            with_collections=True,
+            related_objects=True,
+        )
+        for d in items
+    ]
+    data = {
+        "page": page,
+        "num_pages": num_pages,
+        "pagesize": pagesize,
+        "total": total,
+        "num": len(item_dicts),
+        "data": item_dicts,
+    }
+    if explain_results:
+        data["data_snippets"] = data_snippets
+        data["filter_counts"] = filter_counts
 
     return data
 
 
+@db_session
+@cached
+def get_search_total(filters: dict = {}, search_text: str = None) -> int:
+    """Returns the number of items matching the filters and search text.
+
+    The number is cached so that it is counted once for all pages of the same
+    search, and for its preview, rather than once per page.
+
+    Args:
+        filters (dict, optional): Filters to apply. Defaults to {}.
+
+        search_text (str, optional): Text to search by. Defaults to None.
+
+    Returns:
+        int: The number of matching items.
+    """
+    return apply_filters_to_items(get_all_items(), filters, search_text).count()
+
+
 @db_session
 def apply_filters_to_items(
     items: Query, filters: dict = {}, search_text: str = None
@@ -512,132 +708,39 @@ def apply_filters_to_items(
     Returns:
         Query: The filtered items query.
     """
-    # tag_sets: tuple = ("key_topics", "covid_tags")
+    # filter one query over all items, so each filter adds a condition to it
+    # rather than wrapping it in another subquery
+    if not isinstance(items, Query):
+        items = select(i for i in items)
+
     field: str = None
     for field in filters:
         allowed_values: List[Any] = [str(v) for v in filters[field]]
         if len(allowed_values) == 0:
             continue
 
-        # filters items by Tag attributes
-        if field == "key_topics":
-            items = select(
-                i_key_topics
-                for i_key_topics in items
-                for key_topic in i_key_topics.key_topics
-                if key_topic.name in allowed_values
-            ).prefetch(
-                db.Item.covid_tags,
-                db.Item.key_topics,
-                db.Item.funders,
-                db.Item.authors,
-                db.Item.tags,
-                db.Item.files,
-                db.Item.events,
-                db.Item.items,
-            )
-        elif field == "covid_tags":
-            items = select(
-                i_covid_tags
-                for i_covid_tags in items
-                for j_covid_tag in i_covid_tags.covid_tags
-                if j_covid_tag.name in allowed_values
-            ).prefetch(
-                db.Item.covid_tags,
-                db.Item.key_topics,
-                db.Item.funders,
-                db.Item.authors,
-                db.Item.tags,
-                db.Item.files,
-                db.Item.events,
-                db.Item.items,
-            )
+        # filter items with a predefined query, if the field has one
+        if field in RELATION_FILTERS:
+            items = RELATION_FILTERS[field](items, allowed_values)
 
-        # filter items by linked attributes
+        # filter items by other linked attributes; these and the other
+        # attributes below are named by variables, so Pony translates their
+        # queries again whenever the field differs from the previous one
         elif "." in field:
             field_arr = field.split(".")
             entity_name = field_arr[0]
             linked_field = field_arr[1]
-            if entity_name == "author" and linked_field == "id":
-                items = select(
-                    i_linked_author
-                    for i_linked_author in items
-                    for j_linked_author in i_linked_author.authors
-                    if str(j_linked_author.id) in allowed_values
-                ).prefetch(
-                    db.Item.key_topics,
-                    db.Item.funders,
-                    db.Item.authors,
-                    db.Item.tags,
-                    db.Item.files,
-                    db.Item.events,
-                    db.Item.items,
-                )
-            elif (
-                entity_name == "author"
-                and linked_field == "type_of_authoring_organization"
-            ):
-                items = select(
-                    i_linked_author_type
-                    for i_linked_author_type in items
-                    for j_linked_author_type in i_linked_author_type.authors
-                    if str(j_linked_author_type.type_of_authoring_organization)
-                    in allowed_values
-                ).prefetch(
-                    db.Item.key_topics,
-                    db.Item.funders,
-                    db.Item.authors,
-                    db.Item.tags,
-                    db.Item.files,
-                    db.Item.events,
-                    db.Item.items,
-                )
-            elif entity_name == "funder" and linked_field == "name":
-                items = select(
-                    i_linked_funder
-                    for i_linked_funder in items
-                    for j_linked_funder in i_linked_funder.funders
-                    if str(j_linked_funder.name) in allowed_values
-                ).prefetch(
-                    db.Item.key_topics,
-                    db.Item.funders,
-                    db.Item.authors,
-                    db.Item.tags,
-                    db.Item.files,
-                    db.Item.events,
-                    db.Item.items,
-                )
-            else:
-                items = select(
-                    i_linked
-                    for i_linked in items
-                    for j_linked in getattr(i_linked, entity_name + "s")
-                    if str(getattr(j_linked, linked_field)) in allowed_values
-                ).prefetch(
-                    db.Item.key_topics,
-                    db.Item.funders,
-                    db.Item.authors,
-                    db.Item.tags,
-                    db.Item.files,
-                    db.Item.events,
-                    db.Item.items,
+            items = items.filter(
+                lambda i: exists(
+                    j
+                    for j in getattr(i, entity_name + "s")
+                    if str(getattr(j, linked_field)) in allowed_values
                 )
+            )
         # special: years
         elif field == "years":
             if not allowed_values[0].startswith("range"):
-                items = select(
-                    i_years
-                    for i_years in items
-                    if str(i_years.date.year) in allowed_values
-                ).prefetch(
-                    db.Item.key_topics,
-                    db.Item.funders,
-                    db.Item.authors,
-                    db.Item.tags,
-                    db.Item.files,
-                    db.Item.events,
-                    db.Item.items,
-                )
+                items = items.filter(lambda i: str(i.date.year) in allowed_values)
             else:
                 range = allowed_values[0].split("_")[1:3]
                 start = int(range[0]) if range[0] != "null" else 0
@@ -647,55 +750,24 @@ def apply_filters_to_items(
                         f"Start year ({start}) must be less than or equal to"
                         f" end year ({end})"
                     )
-                items = select(
-                    i_range
-                    for i_range in items
-                    if i_range.date.year >= start and i_range.date.year <= end
-                ).prefetch(
-                    db.Item.key_topics,
-                    db.Item.funders,
-                    db.Item.authors,
-                    db.Item.tags,
-                    db.Item.files,
-                    db.Item.events,
-                    db.Item.items,
+                items = items.filter(
+                    lambda i: i.date.year >= start and i.date.year <= end
                 )
         else:
-            items = select(
-                i_standard
-                for i_standard in items
-                if str(getattr(i_standard, field)) in allowed_values
-            ).prefetch(
-                db.Item.key_topics,
-                db.Item.funders,
-                db.Item.authors,
-                db.Item.covid_tags,
-                db.Item.tags,
-                db.Item.files,
-                db.Item.events,
-                db.Item.items,
-            )
+            items = items.filter(lambda i: str(getattr(i, field)) in allowed_values)
 
-    # apply search text
+    # apply search text; the substring tests compile to `LIKE '%...%'`,
+    # which the trigram indexes in `dbdocs/sql/add_search_text_indexes.sql` serve
     if search_text is not None and search_text != "":
         max_chars = 1000
         cur_search_text = search_text.lower()
-        items = select(
-            i
-            for i in items
-            if cur_search_text in i.search_text
+        items = items.filter(
+            lambda i: cur_search_text in i.search_text
             or cur_search_text in i.file_search_text[0:max_chars]
-        ).prefetch(
-            db.Item.key_topics,
-            db.Item.funders,
-            db.Item.authors,
-            db.Item.tags,
-            db.Item.files,
-            db.Item.events,
-            db.Item.items,
         )
 
-    return items
+    # prefetch the linked entities of the filtered items
+    return items.prefetch(*ITEM_PREFETCH)
 
 
 def apply_ordering_to_items(
@@ -703,9 +775,8 @@ def apply_ordering_to_items(
     order_by: str = "date",
     is_desc: bool = True,
     search_text: str = None,
-) -> Union[Query, List[Item]]:
-    """Returns ordered list of items either as database query or, if ordering
-    by item relevance, a list of Item instances.
+) -> Query:
+    """Returns database query of items in order.
 
     Args:
         items (Query): The query selecting items to be ordered.
@@ -719,37 +790,29 @@ def apply_ordering_to_items(
         item relevance if ordering by relevance. Defaults to None.
 
     Returns:
-        Union[Query, List[Item]]: The item database query or, if ordering by
-        relevance, the list of Item instances.
+        Query: The ordered item database query.
     """
 
     # TODO implement col ordering (relevance is done for now)
     by_relevance = order_by == "relevance"
-    item_ids_by_relevance = list()
     if by_relevance and search_text is not None and search_text != "":
 
-        cur_search_text = search_text.lower()
-        for d in items:
-            relevance = None
-            if cur_search_text in d.title.lower():
-                relevance = 3
-            elif cur_search_text in d.description.lower():
-                relevance = 2
-            else:
-                relevance = 0
-            item_ids_by_relevance.append((d.id, relevance))
-        item_ids_by_relevance.sort(key=lambda x: x[1])
-        item_ids_by_relevance.reverse()
-        items = [db.Item[i[0]] for i in item_ids_by_relevance]
+        # rank items with title matches first, then description matches, in
+        # the database; search text is bound from this frame by `$cur_search_text`
+        cur_search_text = search_text.lower()  # noqa: F841
+        items = items.order_by(
+            raw_sql(
+                """CASE WHEN strpos(lower(i.title), $cur_search_text) > 0 THEN 3
+                WHEN strpos(lower(i.description), $cur_search_text) > 0 THEN 2
+                ELSE 0 END DESC, i.date DESC NULLS LAST"""
+            )
+        )
         # if not sorting by relevance, handle other cases
     elif order_by == "date" or order_by == "title":
-        desc_text = "DESC" if is_desc else ""
 
-        # put nulls last always
-        if order_by == "date":
-            items = items.order_by(raw_sql(f"""i.date {desc_text} NULLS LAST"""))
-        elif order_by == "title":
-            items = items.order_by(raw_sql(f"""i.title {desc_text} NULLS LAST"""))
+        # put nulls last always; descending date order is served by the index
+        # in `dbdocs/sql/add_item_date_index.sql`
+        items = items.order_by(ITEM_ORDERINGS[(order_by, bool(is_desc))])
 
     return items
 
@@ -770,29 +833,24 @@ def get_matching_instances(
                 "fields": ["authoring_organization"],
                 "match_type": "exact-insensitive",  # TODO other types
                 "snip_length": 1000000,
-                "items_query": lambda x: lambda i: x in i.authors,
             },
             # 'Funder': {
             #     'fields': ['name'],
             #     'match_type': 'exact-insensitive',
-            #     'snip_length': 1000000,
-            #     'items_query': lambda x: lambda i: x in i.funders
+            #     'snip_length': 1000000
             # },
             "Event": {
                 "fields": ["name"],
                 "match_type": "exact-insensitive",
                 "snip_length": 1000000,
-                "items_query": lambda x: lambda i: x in i.events,
             },
             "Key_Topic": {
                 "tag_field": "key_topics",
                 "match_type": "exact-insensitive",
-                "items_query": lambda x: lambda i: x in i.key_topics.name,
             },
             "Tag": {
                 "tag_field": "covid_tags",
                 "match_type": "exact-insensitive",
-                "items_query": lambda x: lambda i: x in i.covid_tags.name,
             },
         }
         matching_instances = search.get_matching_instances(
@@ -832,102 +890,156 @@ def export(filters: dict = None, search_text: str = None):
     }
 
 
-def write_field_val_to_excel_row(
-    excel_row: DefaultOrderedDict,
-    item: Item,
-    meta: Metadata,
-) -> None:
-    """Given the row dict and the `field` info, assigns the value to the row,
-    accounting for linked entities, etc., from the item
+class ExportField(NamedTuple):
+    """Metadata about a field written to the Excel export."""
 
-    Args:
-        row (DefaultOrderedDict): The row dictionary
-        which stores values to be written in the Excel export.
+    field: str
+    type: str
+    colgroup: str
+    display_name: str
+    entity_name: str
+    linked_entity_name: str
+    definition: str
+    possible_values: str
 
-        item (Item): The item from which formatted values are needed.
 
-        field (Metadata): Information about the field corresponding to the
-        Excel column that is being assigned to.
+@db_session
+@cached
+def get_export_fields() -> List[ExportField]:
+    """Returns metadata about the fields written to the Excel export, in
+    column order.
+
+    Returns:
+        List[ExportField]: The exported fields.
     """
+    export_metas: Query = select(
+        i for i in db.Metadata if i.entity_name == "Item" and i.export
+    ).order_by(db.Metadata.order)
+    return [
+        ExportField(
+            field=meta.field,
+            type=meta.type,
+            colgroup=meta.colgroup,
+            display_name=meta.display_name,
+            entity_name=meta.entity_name,
+            linked_entity_name=meta.linked_entity_name,
+            definition=meta.definition,
+            possible_values=meta.possible_values,
+        )
+        for meta in export_metas
+    ]
 
-    def get_formatted_val(item: Item, meta: Metadata) -> Any:
-        """
-        Get formatted value of field based on type for writing to an
-        Excel file.
 
-        Args:
-            item (Item): The item from which a formatted val. is needed
-            meta (Metadata): Info about the column to be assign to.
+def get_export_field_writer(
+    meta: ExportField,
+) -> Callable[[Dict[str, dict], Item], None]:
+    """Returns a function that assigns the value of the field to an export
+    row, accounting for linked entities, etc., from the item.
 
-        Returns:
-            Any: A formatted value of any type to be written to the Excel file.
+    Everything that depends only on the field, e.g., how its values are
+    formatted and whether it is linked, is resolved here once per export
+    rather than once per cell.
+
+    Args:
+        meta (ExportField): Information about the field corresponding to the
+        Excel column that is being assigned to.
+
+    Returns:
+        Callable[[Dict[str, dict], Item], None]: Function taking the row
+        dictionary, keyed by column group, and the item from which formatted
+        values are needed, that assigns the formatted value to the row.
+    """
+    field: str = meta.field
+    colgroup: str = meta.colgroup
+    display_name: str = meta.display_name
+
+    def format_bool(instance: Any) -> str:
+        """Parse boolean values as yes/no."""
+        val_tmp: Any = getattr(instance, field, None)
+        if val_tmp is None:
+            return ""
+        elif val_tmp is True:
+            return "Yes"
+        else:
+            return "No"
+
+    def format_date(instance: Any) -> Any:
+        """Parse dates based on how precise they are and whether they are
+        intended to be sortable.
         """
-        val_tmp: Any = getattr(item, meta.field, None)
-
-        # parse boolean values as yes/no
-        if meta.type == "bool":
-            if val_tmp is None:
-                return ""
-            elif val_tmp is True:
-                return "Yes"
-            else:
-                return "No"
-
-        # parse dates based on how precise they are and whether they are
-        # intended to be sortable.
-        elif meta.type == "date":
-            # sortable date published, with varying degrees of precision
-            if meta.field == "date_sortable":
-                val_tmp = item.date
-                if item.date_type == 1:
-                    month = str(val_tmp.month)
-                    if len(month) == 1:
-                        month = "0" + month
-                    return f"""{str(val_tmp.year)}-{month}-XX"""
-                elif item.date_type == 2:
-                    return f"""{str(val_tmp.year)}-XX-XX"""
-                elif item.date_type == 0:
-                    return str(val_tmp)
-            # date published, with varying degrees of precision
-            elif meta.field == "date":
-                if item.date_type == 1:
-                    return val_tmp.strftime("%b %Y")
-                elif item.date_type == 2:
-                    return val_tmp.strftime("%Y")
-                elif item.date_type == 0:
-                    return val_tmp.strftime("%b %d, %Y")
-
-        # write listlike vals. as semicolon-delimited lists
-        elif is_listlike(val_tmp):
+        val_tmp: Any = getattr(instance, field, None)
+
+        # sortable date published, with varying degrees of precision
+        if field == "date_sortable":
+            val_tmp = instance.date
+            if instance.date_type == 1:
+                month = str(val_tmp.month)
+                if len(month) == 1:
+                    month = "0" + month
+                return f"""{str(val_tmp.year)}-{month}-XX"""
+            elif instance.date_type == 2:
+                return f"""{str(val_tmp.year)}-XX-XX"""
+            elif instance.date_type == 0:
+                return str(val_tmp)
+        # date published, with varying degrees of precision
+        elif field == "date":
+            if instance.date_type == 1:
+                return val_tmp.strftime("%b %Y")
+            elif instance.date_type == 2:
+                return val_tmp.strftime("%Y")
+            elif instance.date_type == 0:
+                return val_tmp.strftime("%b %d, %Y")
+
+    def format_other(instance: Any) -> Any:
+        """Write listlike vals. as semicolon-delimited lists, dates and
+        datetimes as text, and others as-is.
+        """
+        val_tmp: Any = getattr(instance, field, None)
+        if is_listlike(val_tmp):
             return "; ".join([str(v) for v in val_tmp])
+        elif isinstance(val_tmp, db.Entity):
+            return jsonify_custom(val_tmp)
+        elif isinstance(val_tmp, date):
+            return str(val_tmp)
         else:
             return val_tmp if val_tmp is not None else ""
 
+    # choose how values are formatted based on the field type
+    get_formatted_val: Callable[[Any], Any] = format_other
+    if meta.type == "bool":
+        get_formatted_val = format_bool
+    elif meta.type == "date":
+        get_formatted_val = format_date
+
     is_linked: bool = meta.linked_entity_name != meta.entity_name
 
     # non-linked fields: format as needed
     if not is_linked:
-        excel_row[meta.colgroup][meta.display_name] = get_formatted_val(item, meta)
+
+        def write(excel_row: Dict[str, dict], item: Item) -> None:
+            excel_row[colgroup][display_name] = get_formatted_val(item)
 
     # special case: related files URLs
-    elif meta.field == "related_s3_permalink":
-        excel_row[meta.colgroup][meta.display_name] = "\n".join(
-            [f.s3_permalink for f in item.related_files]
-        )
+    elif field == "related_s3_permalink":
+
+        def write(excel_row: Dict[str, dict], item: Item) -> None:
+            excel_row[colgroup][display_name] = "\n".join(
+                [f.s3_permalink for f in item.related_files]
+            )
 
     # linked fields: get values and represent as list of strings (one per line)
     else:
-        linked_field_name = meta.linked_entity_name.lower() + "s"
-        linked_instances = getattr(item, linked_field_name)
-        strs = list()
-        for dd in linked_instances:
-            strs.append(get_formatted_val(dd, meta))
-        excel_row[meta.colgroup][meta.display_name] = "\n".join(strs)
+        linked_field_name: str = meta.linked_entity_name.lower() + "s"
+
+        def write(excel_row: Dict[str, dict], item: Item) -> None:
+            excel_row[colgroup][display_name] = "\n".join(
+                [get_formatted_val(dd) for dd in getattr(item, linked_field_name)]
+            )
+
+    return write
 
 
 @db_session
-@cached
-@jsonify_response
 def get_export_data(filters: dict = None, search_text: str = None) -> List[dict]:
     """Returns items that match the filters for export.
 
@@ -936,15 +1048,19 @@ def get_export_data(filters: dict = None, search_text: str = None) -> List[dict]
         search_text (str, optional): Text to search for. Defaults to None.
 
     Returns:
-        List[dict]: Rows for Excel export.
+        List[dict]: Rows for Excel export, whose values are already formatted
+        as plain strings, numbers, etc., for writing to the Excel file.
+
+    Rows are not cached: each holds every matching item, exports are rare and
+    usually of distinct filters, and writing the Excel file costs far more.
     """
 
     # get data fields to be exported
-    export_metas: Query = select(
-        i for i in db.Metadata if i.entity_name == "Item" and i.export
-    ).order_by(db.Metadata.order)
+    export_metas: List[ExportField] = get_export_fields()
 
-    # get items to be exported
+    # get items to be exported; the filtered items query prefetches the
+    # linked entities written to the export so they are not loaded one item
+    # at a time
     order_field: str = "date"
     items: Query = select(i for i in db.Item).order_by(
         raw_sql(f"""i.{order_field} DESC NULLS LAST""")
@@ -954,47 +1070,86 @@ def get_export_data(filters: dict = None, search_text: str = None) -> List[dict]
     # get rows to write to Excel file
     rows: List[dict] = list()
 
+    # column groups in column order, so each row can be built from plain
+    # dicts with its groups already in place
+    colgroups: List[str] = list(dict.fromkeys(m.colgroup for m in export_metas))
+
+    # get a function writing each field's value to a row
+    writers: List[Callable[[Dict[str, dict], Item], None]] = [
+        get_export_field_writer(meta) for meta in export_metas
+    ]
+
     # format data for export
     item: Item = None
     for item in filtered_items:
-        excel_row: DefaultOrderedDict = DefaultOrderedDict(DefaultOrderedDict)
-        meta: Metadata = None
-        for meta in export_metas:
-            write_field_val_to_excel_row(excel_row, item, meta)
+        excel_row: Dict[str, dict] = {colgroup: dict() for colgroup in colgroups}
+        for write in writers:
+            write(excel_row, item)
         rows.append(excel_row)
 
     return rows
 
 
 @db_session
+@cached
 @jsonify_response
-def get_export_legend_data() -> List[DefaultOrderedDict]:
+def get_export_legend_data() -> List[Dict[str, dict]]:
     """Returns legend entry data for all fields exported in Excel, to be
     written to the Excel's legend sheet.
 
     Returns:
-        List[DefaultOrderedDict]: The definition row
+        List[Dict[str, dict]]: The definition row
         and the possible values row data to write to the Excel legend sheet.
     """
     # get data fields to be exported
-    export_metas: Query = select(
-        i for i in db.Metadata if i.entity_name == "Item" and i.export
-    ).order_by(db.Metadata.order)
+    export_metas: List[ExportField] = get_export_fields()
 
     # format data for export
-    defs_row_text = DefaultOrderedDict(DefaultOrderedDict)
-    poss_vals_row_text = DefaultOrderedDict(DefaultOrderedDict)
-    meta: Metadata = None
+    defs_row_text: Dict[str, dict] = dict()
+    poss_vals_row_text: Dict[str, dict] = dict()
+    meta: ExportField = None
     for meta in export_metas:
         # definition
-        defs_row_text[meta.colgroup][meta.display_name] = meta.definition
+        defs_row_text.setdefault(meta.colgroup, dict())[
+            meta.display_name
+        ] = meta.definition
 
         # possible values
-        poss_vals_row_text[meta.colgroup][meta.display_name] = meta.possible_values
+        poss_vals_row_text.setdefault(meta.colgroup, dict())[
+            meta.display_name
+        ] = meta.possible_values
 
     return [defs_row_text, poss_vals_row_text]
 
 
+@db_session
+@cached
+def get_filter_counts(
+    filters: dict = {}, search_text: str = None, exclude: List[str] = []
+) -> dict:
+    """Returns the number of items with each filter value, given the filters
+    and search text applied.
+
+    Counts depend only on the arguments, so they are cached to avoid
+    repeating the facet aggregate queries for common filter combinations.
+
+    Args:
+        filters (dict, optional): Filters to apply. Defaults to {}.
+
+        search_text (str, optional): Text to search by. Defaults to None.
+
+        exclude (List[str], optional): Filter values to omit from the counts.
+        Defaults to [].
+
+    Returns:
+        dict: Unique and by-value item counts for each filter category.
+    """
+    counter: MetadataCounter = MetadataCounter()
+    return counter.get_metadata_value_counts(
+        exclude=exclude, filters=filters, search_text=search_text
+    )
+
+
 # @cached_items
 @db_session
 def get_ordered_items_and_filter_counts(
@@ -1027,8 +1182,9 @@ def get_ordered_items_and_filter_counts(
 
     Returns:
         Tuple[Query, dict, Dict[str, list]]: The query containing matching item
-        instances; a dictionary counting instances; and, if preview only, the
-        number of matches for each instance by filter value.
+        instances, unordered if preview only; a dictionary counting instances
+        (empty unless results are explained and not a preview); and, if
+        preview only, the number of matches for each instance by filter value.
     """
 
     # get all items
@@ -1046,18 +1202,17 @@ def get_ordered_items_and_filter_counts(
         else dict()
     )
 
-    # get filter value counts for current set
-    counter: MetadataCounter = MetadataCounter()
-    filter_counts: dict = counter.get_metadata_value_counts(
-        items=filtered_items,
-        all_items=all_items,
-        filters=filters,
-        search_text=search_text,
-    )
+    # get filter value counts for current set, only if they will be returned
+    filter_counts: dict = dict()
+    if explain_results and not preview:
+        filter_counts = get_filter_counts(filters=filters, search_text=search_text)
 
-    # get ordered items
-    ordered_items: Query = apply_ordering_to_items(
-        filtered_items, order_by, is_desc, search_text
+    # get ordered items, unless only previewing, in which case only the
+    # number of items is needed
+    ordered_items: Query = (
+        filtered_items
+        if preview
+        else apply_ordering_to_items(filtered_items, order_by, is_desc, search_text)
     )
 
     # get results
@@ -1075,25 +1230,25 @@ def get_ordered_items_and_filter_counts(
 def get_all_items() -> Query:
     """Get all items as query with most fields prefetched.
 
+    Related items (`Item.items`) are not prefetched: prefetching applies to
+    every item loaded, so it would cascade through related items' related
+    items and load much of the table for a single page of results.
+
     Returns:
         Query: Query presenting all items.
     """
-    return select(i for i in db.Item).prefetch(
-        db.Item.key_topics,
-        db.Item.funders,
-        db.Item.authors,
-        db.Item.tags,
-        db.Item.files,
-        db.Item.events,
-        db.Item.items,
-    )
+    return select(i for i in db.Item).prefetch(*ITEM_PREFETCH)
 
 
 @db_session
-def get_glossary() -> List[Glossary]:
-    """Get all glossary instances.
+@cached
+def get_glossary() -> List[dict]:
+    """Get all glossary entries as dictionaries of their attributes.
 
     Returns:
-        List[Glossary]: List of glossary instances.
+        List[dict]: List of glossary entries ordered by column name and term.
     """
-    return db.Glossary.select().order_by(db.Glossary.colname, db.Glossary.term)[:][:]
+    glossary: List[Glossary] = db.Glossary.select().order_by(
+        db.Glossary.colname, db.Glossary.term
+    )
+    return [g.to_dict() for g in glossary]
@@ -4,15 +4,25 @@
 
 # Standard libraries
 import re
+from typing import Match
 
 # from collections import defaultdict
 
 # Third party libraries
-import pprint
-from pony.orm import select, count
+from pony.orm import select, count, raw_sql
 
-# pretty printing: for printing JSON objects legibly
-pp = pprint.PrettyPrinter(indent=4)
+
+def highlight_match(match: Match) -> str:
+    """Returns the text of a search text match wrapped in highlight tags, for
+    use as the replacement function of `re.sub`.
+
+    Args:
+        match (Match): The match of the search text.
+
+    Returns:
+        str: The matched text wrapped in highlight tags.
+    """
+    return "<highlight>" + match.group(0) + "</highlight>"
 
 
 def get_matching_instances(
@@ -20,6 +30,9 @@ def get_matching_instances(
 ):
     matching_instances = dict()
 
+    # compile once, escaping the search text so it is matched literally
+    pattern = re.compile(re.escape(search_text), re.IGNORECASE)
+
     # for each entity to check for matches
     for class_name in to_check:
 
@@ -30,71 +43,72 @@ def get_matching_instances(
         # TODO modularize, reuse code
         if class_name not in ("Key_Topic", "Tag"):
             matching_instances[class_name] = list()
-            matches = list()
             if match_type not in ("exact-insensitive",):
                 raise NotImplementedError(
                     "Unsupported match type: " + match_type
                 )
             else:
-                # for each field to check, collect the matching entities into
-                # a single list `all_matches_tmp`
+                # collect the entities linked to the items that match the
+                # search text in any of the fields, in one query; the field
+                # names come from `to_check`, not from user input
                 fields = to_check[class_name]["fields"]
                 cur_search_text = search_text.lower()
-                all_matches_tmp = set()
-                for field in fields:
-
-                    # get pool of entities from filtered items
-                    pool = select(
-                        k
-                        for i in items
-                        for k in getattr(i, class_name.lower() + "s")
-                    )
-
-                    # get entities that match search string
-                    matches = select(
-                        m
-                        for m in pool
-                        if cur_search_text in getattr(m, field).lower()
+                fields_match = raw_sql(
+                    " OR ".join(
+                        f"strpos(lower(k.{field}), $cur_search_text) > 0"
+                        for field in fields
                     )
-                    all_matches_tmp = all_matches_tmp | set(matches[:][:])
+                )
+                all_matches_tmp = select(
+                    k
+                    for i in items
+                    for k in getattr(i, class_name.lower() + "s")
+                ).filter(fields_match)[:]
+
+                # count the items linked to each match in one query
+                match_ids = tuple(match.id for match in all_matches_tmp)
+                n_items_by_id = dict(
+                    select(
+                        (j.id, count(i))
+                        for i in items
+                        for j in getattr(i, class_name.lower() + "s")
+                        if j.id in match_ids
+                    )[:]
+                    if len(match_ids) > 0
+                    else ()
+                )
 
-                # for each match in the list, count number of results (slow?)
-                # and get snippets showing why the instance matched
-                items_query = to_check[class_name]["items_query"]
+                # for each match in the list, get its number of results and
+                # snippets showing why the instance matched
                 all_matches = list()
                 for match in all_matches_tmp:
-                    # get number of results for this match
-                    n_items = count(items.filter(items_query(match)))
                     d = match.to_dict(only=(["id"] + fields))
-                    d["n_items"] = n_items
+                    d["n_items"] = n_items_by_id.get(match.id, 0)
                     if explain_results:
                         # exact-insensitive snippet
                         # TODO code for finding other types of snippets
                         # TODO score by relevance
                         # TODO add snippet length constraints
                         snippets = dict()
-                        pattern = re.compile(cur_search_text, re.IGNORECASE)
-
-                        def repl(x):
-                            return "<highlight>" + x.group(0) + "</highlight>"
-
                         for field in fields:
                             snippets[field] = list()
-                            if search_text in getattr(match, field).lower():
-                                snippet = re.sub(
-                                    pattern, repl, getattr(match, field)
-                                )
+                            snippet, n_matches = pattern.subn(
+                                highlight_match, getattr(match, field)
+                            )
+                            if n_matches > 0:
                                 snippets[field].append(snippet)
                         d["snippets"] = snippets
                     all_matches.append(d)
                 matching_instances[class_name] = all_matches
-                matching_instances[class_name].sort(key=lambda x: x[field])
+                matching_instances[class_name].sort(
+                    key=lambda x: x[fields[-1]]
+                )
         else:
             # search through all used values for matches, then return
             tag_field: str = to_check[class_name].get("tag_field")
             if tag_field is None:
                 raise ValueError("Must define tag field for this entity.")
-            all_vals = select(getattr(i, tag_field).name for i in items)[:][:]
+            all_vals = select(getattr(i, tag_field).name for i in items)[:]
             if match_type not in ("exact-insensitive",):
                 raise NotImplementedError(
                     "Unsupported match type: " + match_type
@@ -103,13 +117,22 @@ def get_matching_instances(
                 all_matches_tmp = [
                     i for i in all_vals if cur_search_text in i.lower()
                 ]
+
+                # count the items with each matching value in one query
+                n_items_by_name = dict(
+                    select(
+                        (t.name, count(i))
+                        for i in items
+                        for t in getattr(i, tag_field)
+                        if t.name in all_matches_tmp
+                    )[:]
+                    if len(all_matches_tmp) > 0
+                    else ()
+                )
                 all_matches = list()
-                items_query = to_check[class_name]["items_query"]
                 for match in all_matches_tmp:
-                    # get number of results for this match
-                    n_items = count(items.filter(items_query(match)))
                     d = {"name": match}
-                    d["n_items"] = n_items
+                    d["n_items"] = n_items_by_name.get(match, 0)
 
                     # exact-insensitive snippet
                     # TODO code for finding other types of snippets
@@ -117,18 +140,15 @@ def get_matching_instances(
                     # TODO add snippet length constraints
                     if explain_results:
                         snippets = dict()
-                        pattern = re.compile(cur_search_text, re.IGNORECASE)
-
-                        def repl(x):
-                            return "<highlight>" + x.group(0) + "</highlight>"
-
                         for field in fields:
                             snippets[field] = list()
-                            if search_text in match.lower():
-                                snippet = re.sub(pattern, repl, match)
+                            snippet, n_matches = pattern.subn(
+                                highlight_match, match
+                            )
+                            if n_matches > 0:
                                 snippets[field].append(snippet)
                         d["snippets"] = snippets
                     all_matches.append(d)
                 matching_instances[class_name] = all_matches
-                matching_instances[class_name].sort(key=lambda x: x[field])
+                matching_instances[class_name].sort(key=lambda x: x["name"])
     return matching_instances
@@ -0,0 +1,31 @@
+"""Test search results"""
+
+
+# 3rd party modules
+from typing import Any, List, Set
+from pony.orm import db_session
+
+# local modules
+from api import schema
+from .helpers import generate_mapping
+
+
+@db_session
+@generate_mapping
+def test_search_fields():
+    """Only requested item fields should be returned, or all fields if none of
+    the requested fields are item fields."""
+    kwargs: Any = dict(page=1, pagesize=5, explain_results=False)
+    all_fields: List[Set[str]] = [set(d) for d in schema.get_search(**kwargs)["data"]]
+    assert len(all_fields) > 0
+
+    # only valid fields are returned
+    some_fields: List[dict] = schema.get_search(
+        fields=["id", "title", "nope"], **kwargs
+    )["data"]
+    assert all(set(d) == {"id", "title"} for d in some_fields)
+
+    # all fields are returned if none are valid, or none are given
+    for fields in (["nope"], []):
+        data: List[dict] = schema.get_search(fields=fields, **kwargs)["data"]
+        assert [set(d) for d in data] == all_fields
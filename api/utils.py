@@ -6,11 +6,10 @@ from pony.orm.ormtypes import TrackedArray
 import pytz
 import traceback
 import logging
-from collections import defaultdict, OrderedDict, Callable
+from collections import defaultdict, OrderedDict
 from datetime import date
 
 # Third party libraries
-import pprint
 from flask import Response
 from pony.orm.core import Multiset, QueryResult, SetInstance
 
@@ -18,9 +17,6 @@ from pony.orm.core import Multiset, QueryResult, SetInstance
 from db.db import db
 
 
-# pretty printing: for printing JSON objects legibly
-pp = pprint.PrettyPrinter(indent=4)
-
 only = {
     "Item": [
         "id",
@@ -103,7 +99,7 @@ def jsonify_custom(obj):
     elif type(obj).__name__ == "TagSet":
         return "; ".join([d.name for d in obj])
     else:
-        print(obj)
+        logging.debug("No JSON serialization defined for %r", obj)
 
 
 def get_str_from_datetime(dt, t_res, strf_str):
@@ -257,49 +253,51 @@ def jsonify_response(func):
     return wrapper
 
 
-class DefaultOrderedDict(OrderedDict):
-    # Source: http://stackoverflow.com/a/6190500/562769
-    def __init__(self, default_factory=None, *a, **kw):
-        if default_factory is not None and not isinstance(default_factory, Callable):
-            raise TypeError("first argument must be callable")
-        OrderedDict.__init__(self, *a, **kw)
-        self.default_factory = default_factory
+def freeze(value: Any) -> Any:
+    """Returns a hashable equivalent of `value` for use in a cache key, with
+    dicts converted to tuples of their items sorted by key and other
+    collections converted to tuples.
 
-    def __getitem__(self, key):
-        try:
-            return OrderedDict.__getitem__(self, key)
-        except KeyError:
-            return self.__missing__(key)
-
-    def __missing__(self, key):
-        if self.default_factory is None:
-            raise KeyError(key)
-        self[key] = value = self.default_factory()
+    Args:
+        value (Any): Any value, e.g., a dictionary of filters.
+
+    Returns:
+        Any: The hashable equivalent of the value.
+    """
+    if isinstance(value, dict):
+        return tuple(
+            (k, freeze(v)) for k, v in sorted(value.items(), key=lambda x: str(x[0]))
+        )
+    elif isinstance(value, (set, frozenset)):
+        return tuple(sorted((freeze(v) for v in value), key=str))
+    elif isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    else:
         return value
 
-    def __reduce__(self):
-        if self.default_factory is None:
-            args = tuple()
-        else:
-            args = (self.default_factory,)
-        return type(self), args, None, None, self.items()
 
-    def copy(self):
-        return self.__copy__()
+class LRUCache(OrderedDict):
+    """Ordered dict holding at most `maxsize` entries, which evicts the least
+    recently used entry when a new one would exceed that size.
 
-    def __copy__(self):
-        return type(self)(self.default_factory, self)
+    Args:
+        maxsize (int, optional): Maximum number of entries. Defaults to 128.
+    """
 
-    def __deepcopy__(self, memo):
-        import copy
+    def __init__(self, maxsize: int = 128):
+        OrderedDict.__init__(self)
+        self.maxsize = maxsize
 
-        return type(self)(self.default_factory, copy.deepcopy(self.items()))
+    def __getitem__(self, key):
+        value = OrderedDict.__getitem__(self, key)
+        self.move_to_end(key)
+        return value
 
-    def __repr__(self):
-        return "OrderedDefaultDict(%s, %s)" % (
-            self.default_factory,
-            OrderedDict.__repr__(self),
-        )
+    def __setitem__(self, key, value):
+        OrderedDict.__setitem__(self, key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
 
 
 def is_listlike(obj: Any) -> bool:
@@ -0,0 +1,13 @@
+-- Index supporting the default ordering of items by date.
+--
+-- `apply_ordering_to_items` and `get_export_data` in `api/schema.py` order
+-- items with `raw_sql("i.date DESC NULLS LAST")`. An index with the same
+-- ordering lets Postgres read items in order instead of sorting them, so a
+-- page of the most recent items need not sort the whole table. The index
+-- ordering must match the query's, including `NULLS LAST`.
+--
+-- Applied to the local database at the end of each ingest by
+-- `SchmidtPlugin.create_indexes` in `ingest/plugins.py`; `pg_dump` in
+-- `sh/update-schmidt-aws-rds-from-local.sh` carries the index to RDS.
+CREATE INDEX IF NOT EXISTS item_date_desc_nulls_last_idx
+    ON item (date DESC NULLS LAST);
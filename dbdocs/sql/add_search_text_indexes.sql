@@ -0,0 +1,18 @@
+-- Trigram indexes supporting the item search text filter.
+--
+-- `apply_filters_to_items` in `api/schema.py` matches search text as a
+-- substring, which Pony compiles to `LIKE '%...%'` on `item.search_text`
+-- and on the first 1000 characters of `item.file_search_text`. GIN trigram
+-- indexes let Postgres answer those predicates without a sequential scan.
+-- The second index expression must match the query exactly.
+--
+-- Applied to the local database at the end of each ingest by
+-- `SchmidtPlugin.create_indexes` in `ingest/plugins.py`; `pg_dump` in
+-- `sh/update-schmidt-aws-rds-from-local.sh` carries the indexes to RDS.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS item_search_text_trgm_idx
+    ON item USING GIN (search_text gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS item_file_search_text_trgm_idx
+    ON item USING GIN ((substr(file_search_text, 1, 1000)) gin_trgm_ops);
@@ -32,6 +32,9 @@ def main():
     # collate search text for each item from other metadata
     client.update_item_search_text(db)
 
+    # create indexes used by API queries, if they do not exist
+    client.create_indexes(db)
+
     # exit
     sys.exit(0)
 
@@ -56,6 +56,9 @@ def main(stop_if_no_new_or_del: bool = True):
     # collate search text for each item from other metadata
     client.update_item_search_text(db)
 
+    # create indexes used by API queries, if they do not exist
+    client.create_indexes(db)
+
     # write Excel of new items if any
     if len(new_item_ids) > 0:
         write_items_xlsx(new_item_ids, "new")
@@ -54,6 +54,12 @@ OPTIONSET_CLASS_BY_FIELD: Dict[str, Any] = {
     "field_relationship": FieldRelationship,
 }
 
+# SQL scripts creating the indexes that API queries rely on
+INDEX_SQL_PATHS: Tuple[str, ...] = tuple(
+    os.path.join(os.path.dirname(__file__), "..", "dbdocs", "sql", fn)
+    for fn in ("add_search_text_indexes.sql", "add_item_date_index.sql")
+)
+
 # define exported classes
 __all__ = ["SchmidtPlugin"]
 
@@ -476,6 +482,18 @@ class SchmidtPlugin(IngestPlugin):
                 commit()
         print("Complete.")
 
+    @db_session
+    def create_indexes(self, db):
+        """Create the indexes that item search and ordering queries rely on,
+        if they do not already exist.
+        """
+        print("\nCreating indexes...")
+        for path in INDEX_SQL_PATHS:
+            with open(path) as f:
+                db.execute(f.read())
+        commit()
+        print("Complete.")
+
     @db_session
     def clear_records(self, db):
         entity_classes = (